@@ -0,0 +1,41 @@
+"""
+Shared pytest fixtures for test_imports.py and test_indexer.py.
+"""
+
+import os
+import sys
+import pytest
+
+# Let tests import the modules in src/ by the same top-level names src/main.py
+# uses. Numba's on-disk kernel cache records the module name, so compiling
+# kernels as both "kernels" and "src.kernels" breaks loading it under the other.
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+@pytest.fixture(scope="session")
+def nltk_ready():
+    """
+    Import NLTK with the project-local data directory on its search path and make
+    sure the required data is installed. Runs once per test session.
+    
+    Returns:
+        module: The nltk module
+    """
+    # src.preprocessor puts the project-local nltk_data directory first on the NLTK search path
+    from src.preprocessor import NLTK_DATA_DIR, Preprocessor
+    import nltk
+    from test_imports import _find_many
+    
+    needed = Preprocessor.nltk_resources()
+    if needed and not _find_many(needed):
+        pytest.fail(f"NLTK data not found in {NLTK_DATA_DIR}; install it with "
+                    f"python3 -m nltk.downloader -d {NLTK_DATA_DIR} {' '.join(needed.values())}")
+    return nltk
+
+def pytest_generate_tests(metafunc):
+    # One test per src.* module in the test module's MODS list, so each
+    # failing import is reported separately
+    if "src_module" in metafunc.fixturenames:
+        mods = [mod for mod, _ in metafunc.module.MODS if mod.startswith("src.")]
+        metafunc.parametrize("src_module", mods) 
\ No newline at end of file
@@ -1,7 +1,40 @@
+import json
 import math
+import os
+from array import array
 from collections import defaultdict, Counter
+from functools import partial
+import numpy as np
+from scipy.sparse import csc_matrix
+
+try:
+    from .kernels import warm_up
+except ImportError:
+    from kernels import warm_up
+
+def _offsets(lengths):
+    """
+    Get the start offset of each posting list in the concatenated postings.
+    
+    Args:
+        lengths (list): Length of each posting list
+    
+    Returns:
+        numpy.ndarray: len(lengths) + 1 offsets, int32 like the row indices unless
+            there are too many postings. SciPy copies the index arrays when indptr
+            and indices have different dtypes, which would defeat memory-mapping.
+    """
+    total = sum(lengths)
+    dtype = np.int32 if total <= np.iinfo(np.int32).max else np.int64
+    offsets = np.zeros(len(lengths) + 1, dtype=dtype)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
 
 class Indexer:
+    # Bump when preprocessing, the index statistics or the save() format change,
+    # so cached indexes built by older code are not reused
+    FORMAT_VERSION = 1
+    
     def __init__(self, preprocessor):
         """
         Initialize the indexer.
@@ -10,13 +43,28 @@ class Indexer:
             preprocessor: The preprocessor object to use for text preprocessing
         """
         self.preprocessor = preprocessor
-        self.inverted_index = defaultdict(dict)  # term -> {doc_id -> term_freq}
+        # Postings collected during indexing: term -> C int arrays of row indices / freqs.
+        # Kept after finalizing, so more documents can be added and the index finalized again
+        self._postings_docs_build = defaultdict(partial(array, 'i'))
+        self._postings_tf_build = defaultdict(partial(array, 'i'))
+        self._restore_build_buffers = False  # set by load(): buffers must be rebuilt before changes
         self.document_lengths = {}  # doc_id -> document length (number of terms)
         self.avg_doc_length = 0
         self.doc_count = 0
-        self.document_vectors = {}  # doc_id -> sparse vector of tf-idf weights
-        self.document_norms = {}    # doc_id -> norm of document vector
-        
+        self.total_terms = 0        # total number of terms in the collection
+        self.idf_tfidf = {}         # term -> log(N / df)
+        self.idf_bm25 = {}          # term -> BM25 IDF
+        self.term_collection_freq = {}  # term -> occurrences in the whole collection
+        self.collection_prob = {}   # term -> p(term | collection)
+        self.unseen_collection_prob = 0  # p(term | collection) floor for unseen terms
+        self.doc_ids = []           # row index -> doc_id, assigned as documents are added
+        self.doc_index = {}         # doc_id -> row index
+        self.doc_length_array = None  # row index -> document length (int32 array)
+        self.term2id = {}           # term -> term id (column index)
+        self.postings_docs = []     # term id -> int32 array of document row indices
+        self.postings_tf = []       # term id -> float32 array of term frequencies
+        self.tfidf_matrix = None    # (doc_count x vocab_size) L2-normalized TF-IDF weights, CSC
+    
     def add_document(self, doc_id, text):
         """
         Process a document and add it to the index.
@@ -25,6 +73,8 @@ class Indexer:
             doc_id: The document ID
             text: The document text
         """
+        if self._restore_build_buffers:
+            self._rebuild_build_buffers()
         tokens = self.preprocessor.preprocess(text)
         
         # Count term frequencies in this document
@@ -33,53 +83,208 @@ class Indexer:
         # Store document length (number of terms)
         self.document_lengths[doc_id] = len(tokens)
         
+        # Assign the document the next dense row index
+        row = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+        self.doc_index[doc_id] = row
+        
         # Update inverted index
         for term, freq in term_freqs.items():
-            self.inverted_index[term][doc_id] = freq
+            self._postings_docs_build[term].append(row)
+            self._postings_tf_build[term].append(freq)
         
         self.doc_count += 1
     
     def finalize_index(self):
         """
         Finalize the index by computing average document length
-        and other required statistics.
+        and other required statistics. Can be called again after adding
+        more documents.
         """
-        if self.doc_count == 0:
-            return
-            
-        # Calculate average document length
-        total_length = sum(self.document_lengths.values())
-        self.avg_doc_length = total_length / self.doc_count
+        if self._restore_build_buffers:
+            self._rebuild_build_buffers()
+        
+        # Calculate average document length. An empty collection (or one of
+        # empty documents) still gets empty arrays, so searches return no results
+        self.total_terms = sum(self.document_lengths.values())
+        self.avg_doc_length = self.total_terms / self.doc_count if self.doc_count else 0.0
+        
+        # Document lengths indexed by row for the array-based scorers
+        self.doc_length_array = np.array(
+            [self.document_lengths[doc_id] for doc_id in self.doc_ids], dtype=np.int32
+        )
+        
+        # Convert postings to contiguous arrays
+        self.build_postings()
+        
+        # Pre-compute per-term statistics used by every query
+        n = self.doc_count
+        for term, term_id in self.term2id.items():
+            df = len(self.postings_docs[term_id])  # Document frequency
+            self.idf_tfidf[term] = math.log(n / df)
+            self.idf_bm25[term] = math.log((n - df + 0.5) / (df + 0.5) + 1.0)
+            self.term_collection_freq[term] = int(self.postings_tf[term_id].sum())
+            self.collection_prob[term] = self.term_collection_freq[term] / self.total_terms
+        
+        # Unseen terms are smoothed as if they occurred once
+        self.unseen_collection_prob = 1 / max(self.total_terms, 1)
         
         # Pre-compute document vectors for Vector Space Model
         self.build_document_vectors()
+        
+        # Compile the scoring kernels now rather than on the first query
+        warm_up()
+    
+    def build_postings(self):
+        """
+        Convert the postings collected during indexing into a pair of NumPy
+        arrays per term (document row indices and term frequencies). Rows are
+        assigned in insertion order, so each posting list is already sorted.
+        """
+        self.term2id = {term: i for i, term in enumerate(self._postings_docs_build)}
+        self.postings_docs = []
+        self.postings_tf = []
+        
+        for term in self.term2id:
+            self.postings_docs.append(
+                np.frombuffer(self._postings_docs_build[term], dtype=np.intc).astype(np.int32))
+            self.postings_tf.append(
+                np.frombuffer(self._postings_tf_build[term], dtype=np.intc).astype(np.float32))
+
+    def _rebuild_build_buffers(self):
+        """
+        Recreate the build buffers from the posting arrays of a loaded index,
+        so that documents can be added to it.
+        """
+        for term, term_id in self.term2id.items():
+            self._postings_docs_build[term] = array('i', self.postings_docs[term_id].tolist())
+            self._postings_tf_build[term] = array('i', self.postings_tf[term_id].astype(np.int32).tolist())
+        self._restore_build_buffers = False
     
     def build_document_vectors(self):
         """
-        Build TF-IDF document vectors for the Vector Space Model.
-        """
-        # For each term, calculate IDF
-        idfs = {}
-        for term, doc_freq_dict in self.inverted_index.items():
-            df = len(doc_freq_dict)  # Document frequency
-            idfs[term] = math.log(self.doc_count / df)
-        
-        # For each document, build its TF-IDF vector
-        for doc_id in self.document_lengths:
-            vector = {}
-            
-            for term, idf in idfs.items():
-                if doc_id in self.inverted_index[term]:
-                    tf = self.inverted_index[term][doc_id]
-                    # Using log normalization for TF
-                    if tf > 0:
-                        normalized_tf = 1 + math.log(tf)
-                        vector[term] = normalized_tf * idf
-            
-            self.document_vectors[doc_id] = vector
-            
-            # Calculate document vector norm
-            self.document_norms[doc_id] = math.sqrt(sum(w**2 for w in vector.values()))
+        Build the TF-IDF document-term matrix for the Vector Space Model.
+        
+        Each row is a document's TF-IDF vector, L2-normalized once here so
+        that cosine similarity reduces to a sparse matrix-vector product.
+        The matrix is stored column-major so a query only touches the
+        posting columns of its own terms.
+        """
+        # The posting arrays are already in CSC layout: one column per term,
+        # row indices sorted within each column
+        df = np.array([len(docs) for docs in self.postings_docs], dtype=np.int64)
+        indptr = _offsets(df.tolist())
+        indices = np.concatenate(self.postings_docs or [np.zeros(0, dtype=np.int32)])
+        idfs = np.array([self.idf_tfidf[term] for term in self.term2id], dtype=np.float64)
+        # Using log normalization for TF
+        tfs = np.concatenate(self.postings_tf or [np.zeros(0)]).astype(np.float64)
+        data = (1 + np.log(tfs)) * np.repeat(idfs, df)
+        
+        # L2-normalize each row (empty/zero rows are left as zeros)
+        norms = np.sqrt(np.bincount(indices, weights=data * data, minlength=len(self.doc_ids)))
+        norms[norms == 0] = 1.0
+        data /= norms[indices]
+        
+        self.tfidf_matrix = csc_matrix(
+            (data, indices, indptr),
+            shape=(len(self.doc_ids), len(self.term2id))
+        )
+    
+    def save(self, path):
+        """
+        Save the finalized index to a directory of .npy files plus a JSON file
+        for the string mappings and scalar statistics.
+        
+        The postings are stored CSR-style: all postings concatenated, with
+        per-term start offsets in postings_offsets.npy.
+        
+        Args:
+            path (str): Directory to write the index files to
+        """
+        os.makedirs(path, exist_ok=True)
+        terms = list(self.term2id)
+        offsets = _offsets([len(docs) for docs in self.postings_docs])
+        
+        arrays = {
+            'postings_docs': np.concatenate(self.postings_docs or [np.zeros(0)]).astype(np.int32),
+            'postings_tf': np.concatenate(self.postings_tf or [np.zeros(0)]).astype(np.float32),
+            'postings_offsets': offsets,
+            'doclen': self.doc_length_array,
+            'idf_tfidf': np.array([self.idf_tfidf[term] for term in terms], dtype=np.float64),
+            'idf_bm25': np.array([self.idf_bm25[term] for term in terms], dtype=np.float64),
+            'term_collection_freq': np.array([self.term_collection_freq[term] for term in terms],
+                                             dtype=np.int64),
+            # Same layout as the postings, so the offsets double as the CSC indptr
+            'tfidf_data': self.tfidf_matrix.data,
+        }
+        for name, values in arrays.items():
+            np.save(os.path.join(path, f"{name}.npy"), values)
+        
+        metadata = {
+            'terms': terms,
+            'doc_ids': self.doc_ids,
+            'doc_count': self.doc_count,
+            'total_terms': self.total_terms,
+            'avg_doc_length': self.avg_doc_length,
+        }
+        with open(os.path.join(path, "term2id.json"), 'w') as f:
+            json.dump(metadata, f)
+    
+    @classmethod
+    def load(cls, path, preprocessor):
+        """
+        Load an index written by save(). The arrays are memory-mapped rather
+        than read into memory.
+        
+        Args:
+            path (str): Directory containing the index files
+            preprocessor: The preprocessor object to use for text preprocessing
+        
+        Returns:
+            Indexer: The loaded, finalized index
+        """
+        def load_array(name):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r')
+        
+        with open(os.path.join(path, "term2id.json"), 'r') as f:
+            metadata = json.load(f)
+        
+        indexer = cls(preprocessor)
+        terms = metadata['terms']
+        indexer.doc_ids = metadata['doc_ids']
+        indexer.doc_count = metadata['doc_count']
+        indexer.total_terms = metadata['total_terms']
+        indexer.avg_doc_length = metadata['avg_doc_length']
+        indexer.doc_index = {doc_id: i for i, doc_id in enumerate(indexer.doc_ids)}
+        indexer.term2id = {term: i for i, term in enumerate(terms)}
+        
+        indexer.doc_length_array = load_array('doclen')
+        indexer.document_lengths = dict(zip(indexer.doc_ids, indexer.doc_length_array.tolist()))
+        
+        # Per-term posting arrays are views into the concatenated arrays
+        offsets = load_array('postings_offsets')
+        docs = load_array('postings_docs')
+        tfs = load_array('postings_tf')
+        bounds = list(zip(offsets[:-1].tolist(), offsets[1:].tolist()))
+        indexer.postings_docs = [docs[start:end] for start, end in bounds]
+        indexer.postings_tf = [tfs[start:end] for start, end in bounds]
+        indexer._restore_build_buffers = True
+        
+        indexer.idf_tfidf = dict(zip(terms, load_array('idf_tfidf').tolist()))
+        indexer.idf_bm25 = dict(zip(terms, load_array('idf_bm25').tolist()))
+        indexer.term_collection_freq = dict(zip(terms, load_array('term_collection_freq').tolist()))
+        indexer.collection_prob = {term: freq / indexer.total_terms
+                                   for term, freq in indexer.term_collection_freq.items()}
+        indexer.unseen_collection_prob = 1 / max(indexer.total_terms, 1)
+        
+        indexer.tfidf_matrix = csc_matrix(
+            (load_array('tfidf_data'), docs, offsets),
+            shape=(len(indexer.doc_ids), len(terms))
+        )
+        
+        # Compile the scoring kernels now rather than on the first query
+        warm_up()
+        return indexer
     
     def get_doc_count_for_term(self, term):
         """
@@ -87,11 +292,12 @@ class Indexer:
         
         Args:
             term: The term to look up
-            
+        
         Returns:
             int: Number of documents containing the term
         """
-        return len(self.inverted_index.get(term, {}))
+        term_id = self.term2id.get(term)
+        return 0 if term_id is None else len(self.postings_docs[term_id])
     
     def get_term_frequency(self, term, doc_id):
         """
@@ -100,11 +306,21 @@ class Indexer:
         Args:
             term: The term to look up
             doc_id: The document ID
-            
+        
         Returns:
             int: Frequency of the term in the document, or 0 if not found
         """
-        return self.inverted_index.get(term, {}).get(doc_id, 0)
+        term_id = self.term2id.get(term)
+        row = self.doc_index.get(doc_id)
+        if term_id is None or row is None:
+            return 0
+        
+        # Posting lists are sorted by row index
+        docs = self.postings_docs[term_id]
+        pos = np.searchsorted(docs, row)
+        if pos < len(docs) and docs[pos] == row:
+            return int(self.postings_tf[term_id][pos])
+        return 0
     
     def get_docs_for_term(self, term):
         """
@@ -112,8 +328,13 @@ class Indexer:
         
         Args:
             term: The term to look up
-            
+        
         Returns:
             dict: Dictionary mapping doc_id to term frequency
         """
-        return self.inverted_index.get(term, {}) 
\ No newline at end of file
+        term_id = self.term2id.get(term)
+        if term_id is None:
+            return {}
+        doc_ids = self.doc_ids
+        return {doc_ids[row]: int(tf) for row, tf in
+                zip(self.postings_docs[term_id].tolist(), self.postings_tf[term_id].tolist())} 
\ No newline at end of file
@@ -0,0 +1,51 @@
+import numpy as np
+
+# Numba is optional: without it the kernels fall back to equivalent NumPy expressions
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def bm25_accumulate(docs, tf, length_norm, idf, k1, scores):
+        """
+        Add one query term's BM25 contribution to the per-document scores.
+        
+        Args:
+            docs (numpy.ndarray): Row indices of the documents containing the term
+            tf (numpy.ndarray): Term frequency in each of those documents
+            length_norm (numpy.ndarray): k1 * (1 - b + b * |d| / avgdl) indexed by row index
+            idf (float): BM25 IDF of the term
+            k1 (float): Term frequency saturation parameter
+            scores (numpy.ndarray): Per-document scores, updated in place
+        """
+        for i in range(docs.shape[0]):
+            d = docs[i]
+            f = tf[i]
+            scores[d] += idf * (f * (k1 + 1.0)) / (f + length_norm[d])
+else:
+    def bm25_accumulate(docs, tf, length_norm, idf, k1, scores):
+        """NumPy fallback for bm25_accumulate when Numba is not installed."""
+        # Row indices are unique within a posting list, so fancy-index += is safe.
+        # Upcast tf so the arithmetic runs in float64, like the Numba kernel
+        tf = tf.astype(np.float64)
+        scores[docs] += idf * (tf * (k1 + 1.0)) / (tf + length_norm[docs])
+
+
+def warm_up():
+    """
+    Trigger JIT compilation of the kernels with the dtypes used by the index,
+    so the first query doesn't pay the compilation cost. Posting arrays of a
+    memory-mapped index are read-only, which Numba compiles separately.
+    """
+    length_norm = np.ones(1, dtype=np.float64)
+    scores = np.zeros(1, dtype=np.float64)
+    for writeable in (True, False):
+        docs = np.zeros(1, dtype=np.int32)
+        tf = np.ones(1, dtype=np.float32)
+        docs.flags.writeable = writeable
+        tf.flags.writeable = writeable
+        bm25_accumulate(docs, tf, length_norm, 1.0, 1.2, scores) 
\ No newline at end of file
@@ -1,12 +1,78 @@
 import os
+import sys
 import argparse
+import hashlib
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from preprocessor import Preprocessor
 from indexer import Indexer
 from search import SearchEngine
 from parser import CranfieldParser
 from trec_writer import TrecWriter
 
+# Search engine shared by the query worker processes, set by _init_worker
+_worker_search_engine = None
+
+def _init_worker(search_engine):
+    """Stash the (read-only) search engine in a worker process."""
+    global _worker_search_engine
+    _worker_search_engine = search_engine
+
+def _run_query(job):
+    """Run a single (method_name, query_terms) job in a worker process."""
+    method_name, query_terms = job
+    return getattr(_worker_search_engine, method_name)(query_terms)
+
+def run_queries(search_engine, method_name, queries, executor=None):
+    """
+    Score all queries with one retrieval model.
+    
+    Args:
+        search_engine: The search engine to query
+        method_name (str): Name of the SearchEngine search method to use
+        queries (list): List of (query_id, query_terms) tuples with already
+            preprocessed terms
+        executor: Optional process pool created with _init_worker; queries
+            are scored sequentially in this process if None
+    
+    Returns:
+        dict: Dictionary mapping query_id to list of (doc_id, score) tuples
+    """
+    if executor is None:
+        search_function = getattr(search_engine, method_name)
+        scored = [search_function(query_terms) for _, query_terms in queries]
+    else:
+        jobs = [(method_name, query_terms) for _, query_terms in queries]
+        scored = executor.map(_run_query, jobs, chunksize=16)
+    return dict(zip((query_id for query_id, _ in queries), scored))
+
+def index_cache_path(cache_dir, documents_path, preprocessor):
+    """
+    Get the cache directory for the index of a documents file.
+    
+    The key covers the documents file contents, the index format version, the
+    stopwords and the stemmer implementation, so editing the collection,
+    upgrading the indexing code or switching stemmers builds a fresh index.
+    
+    Args:
+        cache_dir (str): Root directory for cached indexes
+        documents_path (str): Path to the documents XML file
+        preprocessor: The preprocessor the index is built with
+    
+    Returns:
+        str: Directory for this documents file's index
+    """
+    digest = hashlib.sha1()
+    digest.update(f"v{Indexer.FORMAT_VERSION}".encode())
+    digest.update(" ".join(sorted(preprocessor.stop_words)).encode())
+    digest.update(type(preprocessor.stemmer).__module__.encode())
+    with open(documents_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return os.path.join(cache_dir, digest.hexdigest()[:16])
+
 def main():
     # Set up command line arguments
     parser = argparse.ArgumentParser(description='Cranfield Search Engine')
@@ -14,6 +80,9 @@ def main():
     parser.add_argument('--queries', required=True, help='Path to the queries XML file')
     parser.add_argument('--output_dir', required=True, help='Directory to store the output files')
     parser.add_argument('--run_id', default='my_search_engine', help='Identifier for this run')
+    parser.add_argument('--index_cache', help='Directory to cache the built index in and load it from on reruns')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of processes used to score queries (1 = sequential)')
     args = parser.parse_args()
     
     # Create output directory if it doesn't exist
@@ -23,24 +92,41 @@ def main():
     
     # Initialize preprocessor, indexer, and search engine
     preprocessor = Preprocessor()
-    indexer = Indexer(preprocessor)
+    cache_path = None
+    if args.index_cache:
+        try:
+            cache_path = index_cache_path(args.index_cache, args.documents, preprocessor)
+        except OSError as e:
+            print(f"Error reading documents from {args.documents}: {e}")
+            return 1
     
-    # Parse documents
-    print(f"Parsing documents from {args.documents}...")
     start_time = time.time()
-    documents = CranfieldParser.parse_documents(args.documents)
-    print(f"Parsed {len(documents)} documents in {time.time() - start_time:.2f} seconds")
-    
-    # Index documents
-    print("Indexing documents...")
-    start_time = time.time()
-    for doc in documents:
-        indexer.add_document(doc.doc_id, doc.text)
-    
-    # Finalize index
-    indexer.finalize_index()
-    print(f"Indexed {indexer.doc_count} documents in {time.time() - start_time:.2f} seconds")
-    print(f"Vocabulary size: {len(indexer.inverted_index)} terms")
+    if cache_path and os.path.isfile(os.path.join(cache_path, "term2id.json")):
+        # Reuse the index built by a previous run on the same documents
+        print(f"Loading cached index from {cache_path}...")
+        indexer = Indexer.load(cache_path, preprocessor)
+        print(f"Loaded index of {indexer.doc_count} documents in {time.time() - start_time:.2f} seconds")
+    else:
+        indexer = Indexer(preprocessor)
+        
+        # Parse and index documents, streaming them straight from the XML file
+        print(f"Parsing and indexing documents from {args.documents}...")
+        try:
+            for doc in CranfieldParser.iter_documents(args.documents):
+                indexer.add_document(doc.doc_id, doc.text)
+        except Exception as e:
+            # Don't index, cache or search a partially parsed collection
+            print(f"Error parsing documents from {args.documents}: {e}")
+            return 1
+        
+        # Finalize index
+        indexer.finalize_index()
+        print(f"Indexed {indexer.doc_count} documents in {time.time() - start_time:.2f} seconds")
+        
+        if cache_path:
+            indexer.save(cache_path)
+            print(f"Index cached to {cache_path}")
+    print(f"Vocabulary size: {len(indexer.term2id)} terms")
     print(f"Average document length: {indexer.avg_doc_length:.2f} terms")
     
     # Create search engine
@@ -59,30 +145,42 @@ def main():
             f.write(f"{seq_id},{orig_id}\n")
     print(f"Query ID mapping saved to {mapping_file}")
     
+    # Preprocess each query once and share the terms across all three models
+    tokenized_queries = [(query.query_id, preprocessor.preprocess(query.text)) for query in queries]
+    
     # Process queries with all three models
     models = [
-        ('vsm', search_engine.search_vsm),
-        ('bm25', search_engine.search_bm25),
-        ('lm_dirichlet', search_engine.search_lm_dirichlet)
+        ('vsm', 'search_vsm'),
+        ('bm25', 'search_bm25'),
+        ('lm_dirichlet', 'search_lm_dirichlet')
     ]
     
-    for model_name, search_function in models:
-        print(f"Processing queries with {model_name} model...")
-        start_time = time.time()
-        
-        results = {}
-        for query in queries:
-            results[query.query_id] = search_function(query.text)
-        
-        # Write results to file
-        output_file = os.path.join(args.output_dir, f"results_{model_name}.txt")
-        run_id = f"{args.run_id}_{model_name}"
-        TrecWriter.write_results(results, output_file, run_id)
-        
-        print(f"Completed {model_name} search in {time.time() - start_time:.2f} seconds")
-        print(f"Results written to {output_file}")
+    # Queries are independent, so they can be scored in parallel. On Linux, forked
+    # workers share the index with the parent through copy-on-write instead of
+    # pickling it; elsewhere fork is unsafe (e.g. macOS), so the platform default is used.
+    if args.workers > 1:
+        context = multiprocessing.get_context('fork' if sys.platform.startswith('linux') else None)
+        executor = ProcessPoolExecutor(max_workers=args.workers, mp_context=context,
+                                       initializer=_init_worker, initargs=(search_engine,))
+    else:
+        executor = nullcontext()
+    
+    with executor as pool:
+        for model_name, method_name in models:
+            print(f"Processing queries with {model_name} model...")
+            start_time = time.time()
+            
+            results = run_queries(search_engine, method_name, tokenized_queries, pool)
+            
+            # Write results to file
+            output_file = os.path.join(args.output_dir, f"results_{model_name}.txt")
+            run_id = f"{args.run_id}_{model_name}"
+            TrecWriter.write_results(results, output_file, run_id)
+            
+            print(f"Completed {model_name} search in {time.time() - start_time:.2f} seconds")
+            print(f"Results written to {output_file}")
     
     print("Search engine execution completed.")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main()) 
\ No newline at end of file
@@ -10,29 +10,90 @@ class CranfieldParser:
     """Parser for the Cranfield collection in TREC XML format."""
     
     @staticmethod
-    def read_and_fix_xml(xml_file_path):
+    def iter_elements(xml_file_path, tag, chunk_size=1 << 16):
         """
-        Read XML file and fix it by adding a root element if needed.
+        Stream the elements with the given tag from an XML file, adding a
+        root element if needed. Each element is cleared once the caller has
+        consumed it, so memory stays constant regardless of file size.
         
         Args:
             xml_file_path (str): Path to the XML file
+            tag (str): Tag of the elements to yield
+            chunk_size (int): Number of characters read per chunk
             
-        Returns:
-            str: Valid XML content with a root element
+        Yields:
+            xml.etree.ElementTree.Element: Each complete element with the given tag
         """
-        try:
-            with open(xml_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        root = None
+        
+        with open(xml_file_path, 'r', encoding='utf-8') as f:
+            chunk = f.read(chunk_size)
+            
             # Check if the content already has a root element
-            if not content.strip().startswith('<?xml') and not content.strip().startswith('<xml>'):
+            needs_root = not chunk.lstrip().startswith('<?xml') and not chunk.lstrip().startswith('<xml>')
+            if needs_root:
                 # Wrap the content with a root element
-                content = f'<xml>\n{content}\n</xml>'
+                parser.feed('<xml>\n')
+            
+            while True:
+                if not chunk:
+                    if needs_root:
+                        parser.feed('\n</xml>')
+                        needs_root = False
+                    parser.close()
+                else:
+                    parser.feed(chunk)
                 
-            return content
-        except Exception as e:
-            print(f"Error reading XML file: {e}")
-            return None
+                for event, elem in parser.read_events():
+                    if event == 'start':
+                        if root is None:
+                            root = elem
+                    elif elem.tag == tag:
+                        yield elem
+                        # Free the element and drop already processed siblings
+                        elem.clear()
+                        root.clear()
+                
+                if not chunk:
+                    break
+                chunk = f.read(chunk_size)
+    
+    @staticmethod
+    def iter_documents(xml_file_path):
+        """
+        Stream the Cranfield document collection one document at a time.
+        
+        Args:
+            xml_file_path (str): Path to the XML file containing documents
+            
+        Yields:
+            Document: Each parsed document
+            
+        Raises:
+            xml.etree.ElementTree.ParseError: If the XML is malformed. Documents
+                before the error have already been yielded, so callers that
+                need the whole collection should treat this as fatal.
+        """
+        for doc_elem in CranfieldParser.iter_elements(xml_file_path, 'doc'):
+            doc_id = doc_elem.find('docno').text.strip()
+            
+            # Extract title (may be None)
+            title_elem = doc_elem.find('title')
+            title = title_elem.text.strip() if title_elem is not None and title_elem.text else ""
+            
+            # Extract author (may be None)
+            author_elem = doc_elem.find('author')
+            author = author_elem.text.strip() if author_elem is not None and author_elem.text else ""
+            
+            # Extract text content
+            text_elem = doc_elem.find('text')
+            text = text_elem.text.strip() if text_elem is not None and text_elem.text else ""
+            
+            # Combine title and text for indexing
+            full_text = f"{title} {text}"
+            
+            yield Document(doc_id, title, author, full_text)
     
     @staticmethod
     def parse_documents(xml_file_path):
@@ -45,39 +106,8 @@ class CranfieldParser:
         Returns:
             list: List of Document objects
         """
-        documents = []
-        
         try:
-            # Read and fix XML content
-            xml_content = CranfieldParser.read_and_fix_xml(xml_file_path)
-            if not xml_content:
-                return []
-                
-            # Parse the fixed XML content
-            root = ET.fromstring(xml_content)
-            
-            for doc_elem in root.findall('.//doc'):
-                doc_id = doc_elem.find('docno').text.strip()
-                
-                # Extract title (may be None)
-                title_elem = doc_elem.find('title')
-                title = title_elem.text.strip() if title_elem is not None and title_elem.text else ""
-                
-                # Extract author (may be None)
-                author_elem = doc_elem.find('author')
-                author = author_elem.text.strip() if author_elem is not None and author_elem.text else ""
-                
-                # Extract text content
-                text_elem = doc_elem.find('text')
-                text = text_elem.text.strip() if text_elem is not None and text_elem.text else ""
-                
-                # Combine title and text for indexing
-                full_text = f"{title} {text}"
-                
-                documents.append(Document(doc_id, title, author, full_text))
-                
-            return documents
-            
+            return list(CranfieldParser.iter_documents(xml_file_path))
         except ET.ParseError as e:
             print(f"Error parsing XML file: {e}")
             return []
@@ -101,17 +131,9 @@ class CranfieldParser:
         id_mapping = {}  # Maps sequential_id -> original_id
         
         try:
-            # Read and fix XML content
-            xml_content = CranfieldParser.read_and_fix_xml(xml_file_path)
-            if not xml_content:
-                return [], {}
-            
-            # Parse the fixed XML content
-            root = ET.fromstring(xml_content)
-            
             # First pass: collect all topics
             topics = []
-            for topic_elem in root.findall('.//top'):
+            for topic_elem in CranfieldParser.iter_elements(xml_file_path, 'top'):
                 original_id = topic_elem.find('num').text.strip()
                 
                 # Extract title (query text)
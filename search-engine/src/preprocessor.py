@@ -1,22 +1,79 @@
+import os
 import re
+import string
+import sys
 import nltk
+import Stemmer
 from nltk.corpus import stopwords
-from nltk.stem import PorterStemmer
+
+# Project-local NLTK data (search-engine/nltk_data, not committed) is searched first
+NLTK_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "nltk_data")
+if NLTK_DATA_DIR not in nltk.data.path:
+    nltk.data.path.insert(0, NLTK_DATA_DIR)
 
 class Preprocessor:
+    # NLTK data used by the preprocessor. Tokenization is a plain split, so punkt isn't needed
+    USES_NLTK_PUNKT = False
+    USES_NLTK_STOPWORDS = True
+    
     def __init__(self):
         """Initialize the preprocessor with stopwords and stemmer."""
         # Download required NLTK resources
+        needed = self.nltk_resources()
         try:
-            nltk.data.find('tokenizers/punkt')
-            nltk.data.find('corpora/stopwords')
+            for resource in needed:
+                nltk.data.find(resource)
         except LookupError:
-            print("Downloading required NLTK resources...")
-            nltk.download('punkt')
-            nltk.download('stopwords')
+            print(f"Downloading required NLTK resources to {NLTK_DATA_DIR}...")
+            for package in needed.values():
+                nltk.download(package, download_dir=NLTK_DATA_DIR)
         
         self.stop_words = set(stopwords.words('english'))
-        self.stemmer = PorterStemmer()
+        self.stemmer, self._stem = self._create_stemmer()
+        self._stem_cache = {}  # surface form -> stem, shared across all documents and queries
+        self._special_chars = re.compile(r'[^a-z0-9\s]')  # applied after lowercasing
+        # Same cleanup as a translation table for the (common) all-ASCII case
+        keep = set(string.ascii_lowercase + string.digits)
+        self._ascii_table = str.maketrans({chr(c): ' ' for c in range(128) if chr(c) not in keep})
+    
+    @classmethod
+    def nltk_resources(cls):
+        """
+        Get the NLTK data this preprocessor needs.
+        
+        Returns:
+            dict: Mapping from NLTK data resource path to downloader package name
+        """
+        resources = {}
+        if cls.USES_NLTK_PUNKT:
+            resources['tokenizers/punkt'] = 'punkt'
+        if cls.USES_NLTK_STOPWORDS:
+            resources['corpora/stopwords'] = 'stopwords'
+        return resources
+    
+    @staticmethod
+    def _create_stemmer():
+        """
+        Create the Porter stemmer (PyStemmer's C libstemmer implementation).
+        PyStemmer is required rather than optional: NLTK's PorterStemmer
+        produces different stems, so falling back to it would silently
+        change the rankings.
+        
+        Returns:
+            tuple: The stemmer object and its single-word stem function
+        """
+        stemmer = Stemmer.Stemmer('porter')
+        return stemmer, stemmer.stemWord
+    
+    def __getstate__(self):
+        # PyStemmer objects can't be pickled; recreate the stemmer on unpickling
+        state = self.__dict__.copy()
+        del state['stemmer'], state['_stem']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.stemmer, self._stem = self._create_stemmer()
     
     def preprocess(self, text):
         """
@@ -28,26 +85,25 @@ class Preprocessor:
         
         Args:
             text (str): The input text to preprocess
-            
+        
         Returns:
             list: List of preprocessed tokens
         """
         if not text:
             return []
-            
-        # Convert to lowercase
-        text = text.lower()
         
-        # Remove special characters and replace with space
-        text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)
-        
-        # Tokenize
-        tokens = text.split()
+        # Convert to lowercase, remove special characters and tokenize
+        text = text.lower()
+        if text.isascii():
+            tokens = text.translate(self._ascii_table).split()
+        else:
+            tokens = self._special_chars.sub(' ', text).split()
         
-        # Remove stopwords and apply stemming
-        processed_tokens = []
-        for token in tokens:
-            if token not in self.stop_words:
-                processed_tokens.append(self.stemmer.stem(token))
-                
-        return processed_tokens 
\ No newline at end of file
+        # Remove stopwords and apply stemming, stemming each surface form only once.
+        # Stems are interned so every occurrence of a term shares one string object,
+        # which makes term dict lookups in the indexer and searchers identity hits.
+        cache = self._stem_cache
+        stem = self._stem
+        stop_words = self.stop_words
+        return [cache[token] if token in cache else cache.setdefault(token, sys.intern(stem(token)))
+                for token in tokens if token not in stop_words] 
\ No newline at end of file
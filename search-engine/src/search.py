@@ -1,5 +1,11 @@
 import math
-from collections import defaultdict
+from collections import Counter
+import numpy as np
+
+try:
+    from .kernels import bm25_accumulate
+except ImportError:
+    from kernels import bm25_accumulate
 
 class SearchEngine:
     def __init__(self, indexer, preprocessor):
@@ -12,149 +18,189 @@ class SearchEngine:
         """
         self.indexer = indexer
         self.preprocessor = preprocessor
-        
+        self._bm25_length_norm = {}  # (k1, b) -> k1 * (1 - b + b * |d| / avgdl) for every document
+        self._lm_length_norm = {}  # mu -> log(|d| + mu) for every document
+        self._cached_doc_lengths = None  # doc_length_array the two caches were computed from
+    
     def search_vsm(self, query, top_k=100):
         """
         Search using Vector Space Model (TF-IDF).
         
         Args:
-            query (str): The search query
+            query (str or list): The search query, or its already preprocessed terms
             top_k (int): Number of top results to return
-            
+        
         Returns:
             list: List of (doc_id, score) tuples sorted by decreasing score
         """
-        # Preprocess the query
-        query_terms = self.preprocessor.preprocess(query)
+        # Preprocess the query and count term frequencies once
+        query_tf = Counter(self._query_terms(query))
         
         # Build query vector using same weighting as documents
-        query_vector = defaultdict(float)
-        for term in query_terms:
-            if term in self.indexer.inverted_index:
-                # Term frequency in query
-                tf = query_terms.count(term)
+        term_ids, weights = [], []
+        for term, tf in query_tf.items():
+            term_id = self.indexer.term2id.get(term)
+            if term_id is not None:
                 # Log normalization for TF
                 normalized_tf = 1 + math.log(tf)
-                # IDF computation same as document indexing
-                df = self.indexer.get_doc_count_for_term(term)
-                idf = math.log(self.indexer.doc_count / df)
-                # TF-IDF weight for query term
-                query_vector[term] = normalized_tf * idf
-        
-        # Calculate query vector norm
-        query_norm = math.sqrt(sum(w**2 for w in query_vector.values()))
-        
-        # Calculate cosine similarity for each document
-        scores = {}
-        for doc_id, doc_vector in self.indexer.document_vectors.items():
-            dot_product = 0.0
-            for term, weight in query_vector.items():
-                if term in doc_vector:
-                    dot_product += weight * doc_vector[term]
-            
-            # Avoid division by zero
-            if query_norm == 0 or self.indexer.document_norms[doc_id] == 0:
-                scores[doc_id] = 0
-            else:
-                # Cosine similarity
-                scores[doc_id] = dot_product / (query_norm * self.indexer.document_norms[doc_id])
-        
-        # Sort by decreasing score and return top_k
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        return sorted_scores[:top_k]
+                # TF-IDF weight for query term, same IDF as document indexing
+                term_ids.append(term_id)
+                weights.append(normalized_tf * self.indexer.idf_tfidf[term])
+        
+        # Normalize the query vector (avoid division by zero)
+        weights = np.array(weights, dtype=np.float64)
+        query_norm = np.linalg.norm(weights)
+        if query_norm > 0:
+            weights /= query_norm
+        
+        # Cosine similarity using only the posting columns of the query terms
+        scores = self.indexer.tfidf_matrix[:, term_ids] @ weights
+        
+        return self._top_k(scores, top_k)
     
     def search_bm25(self, query, top_k=100, k1=1.2, b=0.75):
         """
         Search using BM25 ranking algorithm.
         
         Args:
-            query (str): The search query
+            query (str or list): The search query, or its already preprocessed terms
             top_k (int): Number of top results to return
             k1 (float): Term frequency saturation parameter
             b (float): Document length normalization parameter
-            
+        
         Returns:
             list: List of (doc_id, score) tuples sorted by decreasing score
         """
-        # Preprocess the query
-        query_terms = self.preprocessor.preprocess(query)
-        
-        # Calculate scores using BM25 formula
-        scores = defaultdict(float)
-        
-        for term in query_terms:
-            if term not in self.indexer.inverted_index:
+        # Preprocess the query and count term frequencies once
+        query_tf = Counter(self._query_terms(query))
+        
+        # Calculate scores using BM25 formula, accumulated per query term by a compiled kernel
+        scores = np.zeros(self.indexer.doc_count, dtype=np.float64)
+        idf_bm25 = self.indexer.idf_bm25
+        
+        # The document length normalization only depends on (k1, b), so compute it once
+        self._sync_length_caches()
+        length_norm = self._bm25_length_norm.get((k1, b))
+        if length_norm is None:
+            doc_lengths = self.indexer.doc_length_array
+            # A collection of empty documents has no average length to normalize by
+            avg_doc_length = self.indexer.avg_doc_length or 1.0
+            length_norm = k1 * (1 - b + b * doc_lengths / avg_doc_length)
+            self._bm25_length_norm[(k1, b)] = length_norm
+        
+        for term, qtf in query_tf.items():
+            term_id = self.indexer.term2id.get(term)
+            if term_id is None:
                 continue
-                
-            # Calculate IDF component of BM25
-            n = self.indexer.doc_count
-            df = self.indexer.get_doc_count_for_term(term)
-            idf = math.log((n - df + 0.5) / (df + 0.5) + 1.0)
-            
-            # For each document containing this term
-            for doc_id, tf in self.indexer.get_docs_for_term(term).items():
-                doc_length = self.indexer.document_lengths[doc_id]
-                avg_doc_length = self.indexer.avg_doc_length
-                
-                # BM25 formula
-                numerator = tf * (k1 + 1)
-                denominator = tf + k1 * (1 - b + b * doc_length / avg_doc_length)
-                scores[doc_id] += idf * (numerator / denominator)
-        
-        # Sort by decreasing score and return top_k
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        return sorted_scores[:top_k]
+            # IDF component of BM25, precomputed at indexing time; a term repeated
+            # in the query contributes once per occurrence
+            bm25_accumulate(self.indexer.postings_docs[term_id], self.indexer.postings_tf[term_id],
+                            length_norm, qtf * idf_bm25[term], k1, scores)
+        
+        # Only documents matching at least one query term are retrieved
+        return self._top_k(scores, top_k, candidates=np.flatnonzero(scores))
     
     def search_lm_dirichlet(self, query, top_k=100, mu=2000):
         """
         Search using Language Model with Dirichlet smoothing.
         
         Args:
-            query (str): The search query
+            query (str or list): The search query, or its already preprocessed terms
             top_k (int): Number of top results to return
             mu (float): Dirichlet smoothing parameter
-            
+        
+        Returns:
+            list: List of (doc_id, score) tuples sorted by decreasing score
+        """
+        # Preprocess the query and count term frequencies once
+        query_tf = Counter(self._query_terms(query))
+        query_length = sum(query_tf.values())
+        
+        # Collection probabilities for smoothing, precomputed at indexing time
+        collection_prob = self.indexer.collection_prob
+        unseen_prob = self.indexer.unseen_collection_prob
+        
+        # log(|d| + mu) only depends on mu, so compute it once per mu
+        self._sync_length_caches()
+        length_norm = self._lm_length_norm.get(mu)
+        if length_norm is None:
+            length_norm = np.log(self.indexer.doc_length_array + mu)
+            self._lm_length_norm[mu] = length_norm
+        
+        # Every document starts from the score it would get if it contained
+        # none of the query terms: sum_t log(mu * p(t|C) / (|d| + mu))
+        base_score = 0.0
+        for term, qtf in query_tf.items():
+            base_score += qtf * math.log(mu * collection_prob.get(term, unseen_prob))
+        scores = base_score - query_length * length_norm
+        
+        # Correct the score only for documents in the query terms' posting lists,
+        # replacing the smoothed-only probability with the observed one
+        for term, qtf in query_tf.items():
+            term_id = self.indexer.term2id.get(term)
+            if term_id is None:
+                continue
+            mu_cp = mu * collection_prob[term]
+            docs = self.indexer.postings_docs[term_id]
+            tf = self.indexer.postings_tf[term_id].astype(np.float64)
+            scores[docs] += qtf * (np.log(tf + mu_cp) - math.log(mu_cp))
+        
+        return self._top_k(scores, top_k)
+    
+    def _sync_length_caches(self):
+        """
+        Drop the cached length normalizations if the index was finalized
+        again (e.g. after adding documents) since they were computed.
+        """
+        if self._cached_doc_lengths is not self.indexer.doc_length_array:
+            self._bm25_length_norm.clear()
+            self._lm_length_norm.clear()
+            self._cached_doc_lengths = self.indexer.doc_length_array
+    
+    def _query_terms(self, query):
+        """
+        Get the preprocessed terms of a query.
+        
+        Args:
+            query (str or list): The raw query text, or a list of terms that
+                were already preprocessed (e.g. shared across several models)
+        
+        Returns:
+            list: List of preprocessed query terms
+        """
+        if isinstance(query, str):
+            return self.preprocessor.preprocess(query)
+        return query
+    
+    def _top_k(self, scores, top_k, candidates=None):
+        """
+        Select the top_k documents from an array of per-document scores.
+        
+        Args:
+            scores (numpy.ndarray): Scores indexed by document row index
+            top_k (int): Number of top results to return
+            candidates (numpy.ndarray): Optional row indices to rank among;
+                all documents are ranked if None
+        
         Returns:
             list: List of (doc_id, score) tuples sorted by decreasing score
         """
-        # Preprocess the query
-        query_terms = self.preprocessor.preprocess(query)
-        
-        # Compute collection statistics for smoothing
-        total_terms = sum(self.indexer.document_lengths.values())
-        
-        # For each term, compute collection probability
-        collection_prob = {}
-        for term in set(query_terms):
-            if term in self.indexer.inverted_index:
-                # Count total occurrences of term in collection
-                term_count = sum(self.indexer.inverted_index[term].values())
-                collection_prob[term] = term_count / total_terms
-            else:
-                collection_prob[term] = 1 / total_terms  # Smoothing for unseen terms
-        
-        # Calculate scores using Language Model with Dirichlet smoothing
-        scores = {}
-        
-        for doc_id, doc_length in self.indexer.document_lengths.items():
-            score = 0.0
-            
-            for term in query_terms:
-                # Term frequency in document
-                tf = self.indexer.get_term_frequency(term, doc_id)
-                
-                # Calculate p(term|document) with Dirichlet smoothing
-                p_term_given_doc = (tf + mu * collection_prob.get(term, 0)) / (doc_length + mu)
-                
-                # Avoid log(0)
-                if p_term_given_doc > 0:
-                    # Log probability (using log sum instead of product for numerical stability)
-                    score += math.log(p_term_given_doc)
-                else:
-                    score -= 100  # Penalize heavily for missing terms
-            
-            scores[doc_id] = score
-        
-        # Sort by decreasing score and return top_k
-        sorted_scores = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        return sorted_scores[:top_k] 
\ No newline at end of file
+        if top_k <= 0:
+            return []
+        candidate_scores = scores if candidates is None else scores[candidates]
+        
+        # Partition so only the top_k candidates are sorted: O(N + k log k).
+        # argpartition picks arbitrarily among docs tied with the k-th score, so
+        # keep every doc scoring at least that much, in collection order; the
+        # stable sort then breaks ties by collection position
+        if top_k < len(candidate_scores):
+            kth = np.partition(candidate_scores, -top_k)[-top_k]
+            top = np.flatnonzero(candidate_scores >= kth)
+        else:
+            top = np.arange(len(candidate_scores))
+        top = top[np.argsort(-candidate_scores[top], kind='stable')][:top_k]
+        if candidates is not None:
+            top = candidates[top]
+        
+        doc_ids = self.indexer.doc_ids
+        return [(doc_ids[i], score) for i, score in zip(top.tolist(), scores[top].tolist())] 
\ No newline at end of file
@@ -15,7 +15,7 @@ class TrecWriter:
     """
     
     @staticmethod
-    def write_results(results, output_file, run_id):
+    def write_results(results, output_file, run_id, assume_sorted=True):
         """
         Write search results to file in TREC format.
         
@@ -23,14 +23,19 @@ class TrecWriter:
             results (dict): Dictionary mapping query_id to list of (doc_id, score) tuples
             output_file (str): Path to the output file
             run_id (str): Identifier for this run
+            assume_sorted (bool): Whether each result list is already sorted by
+                decreasing score, as returned by the SearchEngine search methods
         """
-        with open(output_file, 'w') as f:
-            for query_id, doc_scores in results.items():
-                # Sort by score, descending
+        # Build every line in memory and write the file in a single call
+        lines = []
+        for query_id, doc_scores in results.items():
+            # Sort by score, descending, unless the caller already did
+            if not assume_sorted:
                 doc_scores = sorted(doc_scores, key=lambda x: x[1], reverse=True)
-                
-                # Write results
-                for rank, (doc_id, score) in enumerate(doc_scores, start=1):
-                    # Format: query_id Q0 doc_id rank score run_id
-                    line = f"{query_id} Q0 {doc_id} {rank} {score:.6f} {run_id}\n"
-                    f.write(line) 
\ No newline at end of file
+            
+            # Format: query_id Q0 doc_id rank score run_id
+            lines.extend(f"{query_id} Q0 {doc_id} {rank} {score:.6f} {run_id}\n"
+                         for rank, (doc_id, score) in enumerate(doc_scores, start=1))
+        
+        with open(output_file, 'w', buffering=1 << 20) as f:
+            f.write("".join(lines)) 
\ No newline at end of file
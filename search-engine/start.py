@@ -7,7 +7,7 @@ This script runs all checks and then starts the search engine.
 import os
 import sys
 import subprocess
-from test_imports import test_imports
+from test_imports import check_imports
 from check_dataset import check_dataset
 
 def main():
@@ -17,7 +17,7 @@ def main():
     
     # Check imports
     print("\n[1/3] Checking imports...")
-    if not test_imports():
+    if not check_imports():
         return 1
     
     # Check dataset
@@ -1,58 +1,300 @@
 #!/usr/bin/env python3
 """
 Simple test script to verify that all imports work correctly.
+
+Run as a script, the imports run in a fresh interpreter under
+`python -X importtime`, so this process never imports NLTK or the project
+modules itself and can report how long each module took to import.
+
+The same checks also run under pytest (`python3 -m pytest test_imports.py`),
+with NLTK set up once per session by the `nltk_ready` fixture in conftest.py.
 """
 
-def test_imports():
-    print("Testing imports...")
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+
+# Result of the first check_imports() call in this process
+_RESULT = None
+
+# Fail the check if a module's import takes longer than this (None = no limit)
+IMPORT_BUDGET_MS = None
+
+# Modules to import, with the name reported for each
+MODS = [
+    ("nltk", "NLTK"),
+    ("Stemmer", "PyStemmer"),
+    ("src.preprocessor", "Preprocessor"),
+    ("src.indexer", "Indexer"),
+    ("src.search", "SearchEngine"),
+    ("src.parser", "CranfieldParser"),
+    ("src.trec_writer", "TrecWriter"),
+]
+
+def _find_many(resources):
+    """
+    Check whether all the given NLTK data resources are installed, walking
+    nltk.data.path once rather than once per resource.
+    
+    Args:
+        resources (list): Resource paths, e.g. 'corpora/stopwords'
+    
+    Returns:
+        bool: True if every resource was found, unpacked or as a .zip
+    """
+    import nltk
+    missing = list(resources)
+    for root in nltk.data.path:
+        missing = [r for r in missing
+                   if not os.path.exists(os.path.join(root, r))
+                   and not os.path.exists(os.path.join(root, r + ".zip"))]
+        if not missing:
+            return True
+    return False
+
+def _flush(log):
+    """Write all buffered output lines in a single call and clear the buffer."""
+    if log:
+        sys.stdout.write("\n".join(log) + "\n")
+        sys.stdout.flush()
+        log.clear()
+
+def _lazy(name):
+    """
+    Import a module lazily: the module object is created and registered in
+    sys.modules, but its body only runs on first attribute access.
+    
+    Args:
+        name (str): Fully qualified module name
+    
+    Returns:
+        module: The (not yet executed) module, or the module itself if it
+            was already imported
+    """
+    # An imported module must not be replaced: callers hold its classes
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    loader.exec_module(mod)
+    return mod
+
+def _missing_modules(lazy=False):
+    """
+    Find the modules in MODS that cannot be located, without executing any of them.
+    
+    Args:
+        lazy (bool): Also create lazy module objects for the src.* modules,
+            which checks that their loaders work without running the module bodies
+    
+    Returns:
+        list: Names of the modules that have no import spec
+    """
+    missing = []
+    for mod, _ in MODS:
+        try:
+            if lazy and mod.startswith("src."):
+                _lazy(mod)
+            elif importlib.util.find_spec(mod) is None:
+                missing.append(mod)
+        except ImportError:  # No spec, or the parent package is missing
+            missing.append(mod)
+    return missing
+
+# Printed whenever a required module is missing
+_INSTALL_HINT = [
+    "\nPlease make sure you have installed all required packages:",
+    "pip install -r requirements.txt",
+]
+
+def check_specs_only():
+    """
+    Fast presence check: verify every module can be found without importing it.
+    
+    Returns:
+        bool: True if all modules were found
+    """
+    log = ["Checking modules..."]
+    missing = _missing_modules(lazy=True)
+    if missing:
+        log.extend(f"✗ {mod} not found" for mod in missing)
+        log.extend(_INSTALL_HINT)
+    else:
+        log.append("✓ All modules found")
+    _flush(log)
+    return not missing
+
+def _child_main():
+    """
+    Import everything and check the NLTK data. Runs in the child interpreter
+    and reports back to the parent as a JSON line on stdout.
+    
+    A failing import doesn't stop the check: every module is tried and all
+    errors are reported together.
+    """
+    result = {"imported": [], "errors": [], "nltk_data": None, "nltk_data_dir": None, "nltk_packages": []}
+    
+    for mod, _ in MODS:
+        try:
+            # The builtin __import__ goes through the C import path that
+            # -X importtime instruments; importlib.import_module does not
+            __import__(mod)
+            result["imported"].append(mod)
+        except Exception as e:  # Any error in a module body, not just a missing dependency
+            result["errors"].append([mod, f"{type(e).__name__}: {e}"])
+    
+    # src.preprocessor puts the project-local nltk_data directory first on the NLTK search path.
+    # Only the data the Preprocessor actually uses is probed.
+    if "src.preprocessor" in result["imported"]:
+        from src.preprocessor import NLTK_DATA_DIR, Preprocessor
+        needed = Preprocessor.nltk_resources()
+        result["nltk_data_dir"] = NLTK_DATA_DIR
+        result["nltk_packages"] = list(needed.values())
+        result["nltk_data"] = _find_many(needed) if needed else True
+    print(json.dumps(result))
+
+def _parse_importtime(stderr):
+    """
+    Parse `-X importtime` output.
+    
+    Args:
+        stderr (str): The child interpreter's stderr
+    
+    Returns:
+        dict: Mapping from module name to cumulative import time in microseconds
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # Header line
+        times.setdefault(parts[2].strip(), int(parts[1]))
+    return times
+
+def check_imports():
+    """
+    Check that all imports and NLTK data are available. The checks only run
+    on the first call; later calls in the same process return its result.
+    
+    Returns:
+        bool: True if everything is available
+    """
+    global _RESULT
+    if _RESULT is None:
+        _RESULT = _check_imports()
+    return _RESULT
+
+def _check_imports():
+    # Output is buffered and written in one go rather than printed per check
+    log = ["Testing imports..."]
     
     try:
-        # Test basic imports
-        import os
-        import sys
-        import argparse
-        import time
-        print("✓ Basic imports")
-        
-        # Test NLTK
-        import nltk
-        print("✓ NLTK")
+        # Resolve every spec first so a missing module fails fast, without
+        # starting the child interpreter
+        missing = _missing_modules()
+        if missing:
+            log.append(f"\nImport error: Modules not found: {', '.join(missing)}")
+            log.extend(_INSTALL_HINT)
+            return False
         
-        # Try to find required NLTK data
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--child"],
+            capture_output=True, text=True
+        )
         try:
-            nltk.data.find('tokenizers/punkt')
-            nltk.data.find('corpora/stopwords')
-            print("✓ NLTK data")
-        except LookupError:
-            print("! NLTK data not found, downloading...")
-            nltk.download('punkt')
-            nltk.download('stopwords')
-            print("✓ NLTK data downloaded")
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            log.append("\nImport check crashed:")
+            log.append(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "(no output)")
+            return False
+        times = _parse_importtime(proc.stderr)
         
-        # Test project-specific imports
-        from src.preprocessor import Preprocessor
-        print("✓ Preprocessor")
+        over_budget = []
+        for mod, label in MODS:
+            if mod not in result["imported"]:
+                log.append(f"✗ {label}")
+                continue
+            ms = times.get(mod, 0) / 1000
+            log.append(f"✓ {label} ({ms:.0f} ms)")
+            if IMPORT_BUDGET_MS is not None and ms > IMPORT_BUDGET_MS:
+                over_budget.append(mod)
         
-        from src.indexer import Indexer
-        print("✓ Indexer")
+        # Required NLTK data (only checked when src.preprocessor imported)
+        nltk_data_dir = result["nltk_data_dir"]
+        if result["nltk_data"]:
+            log.append("✓ NLTK data")
+        elif result["nltk_data"] is not None:
+            log.append(f"✗ NLTK data not found in {nltk_data_dir}")
         
-        from src.search import SearchEngine
-        print("✓ SearchEngine")
+        # Report every problem at once rather than stopping at the first
+        ok = True
+        if result["errors"]:
+            log.append("\nImport errors:")
+            log.extend(f"  {mod}: {error}" for mod, error in result["errors"])
+            # Only a missing package is fixed by installing requirements
+            if any(error.startswith(("ImportError", "ModuleNotFoundError")) for _, error in result["errors"]):
+                log.extend(_INSTALL_HINT)
+            ok = False
+        if over_budget:
+            log.append(f"\n✗ Over the {IMPORT_BUDGET_MS} ms import budget: {', '.join(over_budget)}")
+            ok = False
+        if result["nltk_data"] is False:
+            log.append("\nPlease install the NLTK data into the project:")
+            log.append(f"python3 -m nltk.downloader -d {nltk_data_dir} {' '.join(result['nltk_packages'])}")
+            ok = False
         
-        from src.parser import CranfieldParser
-        print("✓ CranfieldParser")
-        
-        from src.trec_writer import TrecWriter
-        print("✓ TrecWriter")
-        
-        print("\nAll imports successful!")
-        return True
-        
-    except ImportError as e:
-        print(f"\nImport error: {e}")
-        print("\nPlease make sure you have installed all required packages:")
-        print("pip install -r requirements.txt")
-        return False
+        if ok:
+            log.append("\nAll imports successful!")
+        return ok
+    
+    finally:
+        _flush(log)
+
+# pytest tests. The `src_module` parameter is generated by conftest.py from MODS.
+
+def test_modules_found():
+    assert not _missing_modules(), "Modules not found"
+
+def test_specs_only_keeps_imported_modules():
+    module = importlib.import_module("src.trec_writer")
+    assert check_specs_only()
+    assert sys.modules["src.trec_writer"] is module
+
+def test_stopwords_loaded(nltk_ready):
+    # The fixture found the data; check the Preprocessor can actually read it
+    from src.preprocessor import Preprocessor
+    if Preprocessor.USES_NLTK_STOPWORDS:
+        assert "the" in Preprocessor().stop_words
+
+def test_import(src_module):
+    importlib.import_module(src_module)
 
 if __name__ == "__main__":
-    test_imports() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Check that all imports and NLTK data are available')
+    parser.add_argument('--specs-only', action='store_true',
+                        help='Only check that the modules can be found, without importing them')
+    parser.add_argument('--budget-ms', type=float,
+                        help='Fail if any module takes longer than this to import')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        _child_main()
+    else:
+        if args.specs_only:
+            ok = check_specs_only()
+        else:
+            IMPORT_BUDGET_MS = args.budget_ms
+            ok = check_imports()
+        sys.exit(0 if ok else 1) 
\ No newline at end of file
@@ -0,0 +1,77 @@
+"""
+Tests for building and searching the index.
+"""
+
+import numpy as np
+import pytest
+
+DOCS = [
+    ("a", "Boundary layer flow over a flat plate"),
+    ("b", "Supersonic flow past a thin wing"),
+    ("c", "Heat transfer in the laminar boundary layer of a swept wing"),
+]
+
+@pytest.fixture
+def preprocessor(nltk_ready):
+    from preprocessor import Preprocessor
+    return Preprocessor()
+
+def build_index(preprocessor, docs):
+    from indexer import Indexer
+    indexer = Indexer(preprocessor)
+    for doc_id, text in docs:
+        indexer.add_document(doc_id, text)
+    indexer.finalize_index()
+    return indexer
+
+def all_results(indexer, preprocessor, query):
+    from search import SearchEngine
+    search_engine = SearchEngine(indexer, preprocessor)
+    return [search_engine.search_vsm(query), search_engine.search_bm25(query),
+            search_engine.search_lm_dirichlet(query)]
+
+def test_finalize_twice(preprocessor):
+    indexer = build_index(preprocessor, DOCS)
+    expected = all_results(indexer, preprocessor, "boundary layer flow")
+    
+    indexer.finalize_index()
+    assert all_results(indexer, preprocessor, "boundary layer flow") == expected
+
+def test_add_after_finalize(preprocessor):
+    from search import SearchEngine
+    indexer = build_index(preprocessor, DOCS[:2])
+    search_engine = SearchEngine(indexer, preprocessor)
+    assert [doc_id for doc_id, _ in search_engine.search_bm25("wing")] == ["b"]
+    
+    indexer.add_document(*DOCS[2])
+    indexer.finalize_index()
+    expected = all_results(build_index(preprocessor, DOCS), preprocessor, "boundary layer wing")
+    assert all_results(indexer, preprocessor, "boundary layer wing") == expected
+    # An existing search engine picks up the re-finalized index
+    assert search_engine.search_bm25("boundary layer wing") == expected[1]
+
+def is_memory_mapped(values):
+    # Follow the chain of views back to the array that owns the memory
+    while values is not None:
+        if isinstance(values, np.memmap):
+            return True
+        values = getattr(values, 'base', None)
+    return False
+
+def test_save_load_round_trip(preprocessor, tmp_path):
+    from indexer import Indexer
+    indexer = build_index(preprocessor, DOCS)
+    indexer.save(str(tmp_path))
+    loaded = Indexer.load(str(tmp_path), preprocessor)
+    
+    assert loaded.doc_ids == indexer.doc_ids
+    assert loaded.term2id == indexer.term2id
+    assert loaded.avg_doc_length == indexer.avg_doc_length
+    for query in ["boundary layer flow", "supersonic wing", "unknownterm"]:
+        assert all_results(loaded, preprocessor, query) == all_results(indexer, preprocessor, query)
+    
+    # The large arrays are used straight from the memory-mapped files
+    matrix = loaded.tfidf_matrix
+    assert all(is_memory_mapped(values) for values in (matrix.data, matrix.indices, matrix.indptr))
+    assert all(is_memory_mapped(docs) for docs in loaded.postings_docs)
+    assert is_memory_mapped(loaded.doc_length_array) 
\ No newline at end of file